@@ -5,7 +5,7 @@ from sqlalchemy import func
 
 # Add Expense
 def create_expense(db: Session, expense):
-    db_expense = Expense(**expense.dict())
+    db_expense = Expense(**expense.model_dump())
     db.add(db_expense)
     db.commit()
     db.refresh(db_expense)
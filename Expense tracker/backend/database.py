@@ -1,12 +1,39 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 DATABASE_URL = "sqlite:///./expenses.db"
 
+# Same file opened read-only through aiosqlite, used by the async stats endpoints
+READ_DATABASE_URL = "sqlite+aiosqlite:///file:./expenses.db?mode=ro&uri=true"
+
 engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}
 )
 
+read_engine = create_async_engine(
+    READ_DATABASE_URL,
+    pool_size=16,
+    max_overflow=32
+)
+
+@event.listens_for(engine, "connect")
+def _set_write_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the writer; the mode is stored in the
+    # database file, so read-only connections pick it up too
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+@event.listens_for(engine, "connect")
+@event.listens_for(read_engine.sync_engine, "connect")
+def _set_cache_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
@@ -1,16 +1,47 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-import models, schemas, crud
+from typing import List, Optional
+import models, schemas, crud, rollup, stats_cache, migrations
 from database import engine, SessionLocal, Base
 from stats_routes import router as stats_router
 
 Base.metadata.create_all(bind=engine)
 
+# Amounts used to be stored as floats; move older databases to cents
+with engine.begin() as connection:
+    migrations.migrate_amounts_to_cents(connection)
+
+# create_all skips existing tables, so add any indexes they are missing
+for index in models.Expense.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+
+# Bring the rollup in line with any rows written outside the app
+with engine.begin() as connection:
+    rollup.rebuild_rollup(connection)
+
 app = FastAPI(title="Expense Tracker API")
 
 # Include stats router
 app.include_router(stats_router)
 
+# Unhandled errors are reported as a JSON 500 carrying the message
+@app.exception_handler(Exception)
+def handle_unexpected_error(request: Request, exc: Exception):
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
+
+# A rejected NaN or Infinity is echoed back as the error's input, which
+# JSON cannot carry, so report it as text
+@app.exception_handler(RequestValidationError)
+def handle_validation_error(request: Request, exc: RequestValidationError):
+    errors = [
+        {**error, 'input': str(error['input'])} if error['type'] == 'finite_number' else error
+        for error in exc.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -27,17 +58,21 @@ def home():
 # Add expense
 @app.post("/expenses", response_model=schemas.ExpenseResponse)
 def add_expense(expense: schemas.ExpenseCreate, db: Session = Depends(get_db)):
-    return crud.create_expense(db, expense)
+    db_expense = crud.create_expense(db, expense)
+    stats_cache.invalidate()
+    return db_expense
 
 # Get all expenses
-@app.get("/expenses")
+@app.get("/expenses", response_model=List[schemas.ExpenseResponse])
 def get_all_expenses(db: Session = Depends(get_db)):
     return crud.get_expenses(db)
 
 # Delete expense
-@app.delete("/expenses/{expense_id}")
+@app.delete("/expenses/{expense_id}", response_model=Optional[schemas.ExpenseResponse])
 def remove_expense(expense_id: int, db: Session = Depends(get_db)):
-    return crud.delete_expense(db, expense_id)
+    expense = crud.delete_expense(db, expense_id)
+    stats_cache.invalidate()
+    return expense
 
 # Category summary for Pie chart
 @app.get("/summary/category")
@@ -0,0 +1,17 @@
+from sqlalchemy import inspect, text
+
+
+def migrate_amounts_to_cents(connection):
+    """Move an expenses table that stored float amounts to integer cents"""
+    columns = {column['name'] for column in inspect(connection).get_columns('expenses')}
+    if 'amount_cents' not in columns:
+        connection.execute(text("ALTER TABLE expenses ADD COLUMN amount_cents INTEGER"))
+
+    # Backfill on every start rather than only after the ALTER, so an
+    # interrupted migration is finished on the next run. Rounds like the
+    # Expense.amount setter: to the cent first, then half away from zero.
+    if 'amount' in columns:
+        connection.execute(text(
+            "UPDATE expenses SET amount_cents = CAST(ROUND(ROUND(amount, 2) * 100) AS INTEGER) "
+            "WHERE amount_cents IS NULL AND amount IS NOT NULL"
+        ))
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import Column, Integer, String, Date, Index, func, literal_column, cast
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import column_property
 from database import Base
 
 class Expense(Base):
@@ -6,6 +9,54 @@ class Expense(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
-    amount = Column(Float)
+    # Stored as integer cents so sums are exact, see amount for the value
+    amount_cents = Column(Integer)
     category = Column(String)
     date = Column(Date)
+
+    # Covering index for the date-filtered aggregations and rollup refreshes
+    __table_args__ = (
+        Index("ix_expenses_date_category_amount_cents", date, category, amount_cents),
+    )
+
+    @hybrid_property
+    def amount(self):
+        """Amount in currency units"""
+        if self.amount_cents is None:
+            return None
+        return self.amount_cents / 100
+
+    @amount.setter
+    def amount(self, value):
+        # Round the decimal value half-up, like the migration's ROUND(amount, 2),
+        # rather than float value * 100 which can land on either side of a half
+        if value is None:
+            self.amount_cents = None
+        else:
+            self.amount_cents = int(Decimal(str(value)).quantize(Decimal('0.01'), ROUND_HALF_UP) * 100)
+
+    @amount.expression
+    def amount(cls):
+        return cls.amount_cents / 100
+
+class DailyRollup(Base):
+    """Per-day, per-category totals maintained from the expenses table"""
+    __tablename__ = "daily_rollup"
+
+    date = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    # Amounts are in cents, like Expense.amount_cents
+    total = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False)
+    min = Column(Integer, nullable=False)
+    max = Column(Integer, nullable=False)
+
+    # Grouping keys for the weekly and monthly stats
+    week = column_property(func.strftime(literal_column("'%Y-W%W'"), date), deferred=True)
+    # month is an integer key (year * 100 + month), cheaper than strftime
+    month = column_property(
+        cast(func.substr(date, 1, 4), Integer) * 100 + cast(func.substr(date, 6, 2), Integer),
+        deferred=True
+    )
+
+    __table_args__ = {"sqlite_with_rowid": False}
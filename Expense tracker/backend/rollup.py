@@ -0,0 +1,106 @@
+from sqlalchemy import event, select, delete, inspect, func
+from sqlalchemy.dialects.sqlite import insert
+
+from models import Expense, DailyRollup
+
+rollup_table = DailyRollup.__table__
+
+
+def _bucket_totals(*criteria):
+    """Aggregate expenses into (date, category) rollup rows"""
+    # Rows missing a date, category or amount have no bucket to count in
+    return select(
+        Expense.date,
+        Expense.category,
+        func.sum(Expense.amount_cents),
+        func.count(Expense.id),
+        func.min(Expense.amount_cents),
+        func.max(Expense.amount_cents)
+    ).where(
+        Expense.date.is_not(None),
+        Expense.category.is_not(None),
+        Expense.amount_cents.is_not(None),
+        *criteria
+    ).group_by(Expense.date, Expense.category)
+
+
+def _refresh_bucket(connection, day, category):
+    """Recompute a single rollup row from the expenses it covers"""
+    connection.execute(
+        delete(rollup_table)
+        .where(rollup_table.c.date == day)
+        .where(rollup_table.c.category == category)
+    )
+    connection.execute(
+        insert(rollup_table).from_select(
+            ['date', 'category', 'total', 'count', 'min', 'max'],
+            _bucket_totals(Expense.date == day, Expense.category == category)
+        )
+    )
+
+
+def rebuild_rollup(connection):
+    """Recompute the whole rollup table from scratch"""
+    connection.execute(delete(rollup_table))
+    connection.execute(
+        insert(rollup_table).from_select(
+            ['date', 'category', 'total', 'count', 'min', 'max'],
+            _bucket_totals()
+        )
+    )
+
+
+@event.listens_for(Expense, "after_insert")
+def _expense_inserted(mapper, connection, target):
+    if target.date is None or target.category is None or target.amount_cents is None:
+        return
+
+    stmt = insert(rollup_table).values(
+        date=target.date,
+        category=target.category,
+        total=target.amount_cents,
+        count=1,
+        min=target.amount_cents,
+        max=target.amount_cents
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[rollup_table.c.date, rollup_table.c.category],
+        set_={
+            'total': rollup_table.c.total + stmt.excluded.total,
+            'count': rollup_table.c.count + 1,
+            'min': func.min(rollup_table.c.min, stmt.excluded.min),
+            'max': func.max(rollup_table.c.max, stmt.excluded.max)
+        }
+    )
+    connection.execute(stmt)
+
+
+# Load the old date and category before they change, even when the
+# expense was expired by a commit, so after_update sees the bucket it left
+@event.listens_for(Expense.date, "set", active_history=True)
+@event.listens_for(Expense.category, "set", active_history=True)
+def _bucket_changing(target, value, oldvalue, initiator):
+    pass
+
+
+@event.listens_for(Expense, "after_update")
+def _expense_updated(mapper, connection, target):
+    # Refresh the bucket the expense left as well as the one it is in now
+    state = inspect(target)
+    old_date = state.attrs.date.history.deleted
+    old_category = state.attrs.category.history.deleted
+    old_bucket = (
+        old_date[0] if old_date else target.date,
+        old_category[0] if old_category else target.category
+    )
+    new_bucket = (target.date, target.category)
+
+    _refresh_bucket(connection, *old_bucket)
+    if new_bucket != old_bucket:
+        _refresh_bucket(connection, *new_bucket)
+
+
+@event.listens_for(Expense, "after_delete")
+def _expense_deleted(mapper, connection, target):
+    # min/max cannot be undone incrementally, so recompute the bucket
+    _refresh_bucket(connection, target.date, target.category)
@@ -1,14 +1,24 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import date
+from typing import Optional
+import datetime
+
+# Amounts are stored as integer cents, keep them well inside SQLite's
+# 64-bit integers so totals over many expenses cannot overflow
+MAX_AMOUNT = 1e12
 
 class ExpenseCreate(BaseModel):
     title: str
-    amount: float
+    amount: float = Field(allow_inf_nan=False, ge=-MAX_AMOUNT, le=MAX_AMOUNT)
     category: str
     date: date
 
-class ExpenseResponse(ExpenseCreate):
+class ExpenseResponse(BaseModel):
+    # Rows created before validation may have missing values
     id: int
+    title: Optional[str] = None
+    amount: Optional[float] = None
+    category: Optional[str] = None
+    date: Optional[datetime.date] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,86 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from fastapi import params, Response
+
+# In-process LRU cache for stats responses, cleared whenever an expense
+# changes. Query strings are client controlled, so the size is capped.
+MAX_ENTRIES = 1024
+
+_entries = OrderedDict()
+_generation = 0
+_lock = threading.Lock()
+
+
+def invalidate():
+    """Drop every cached stats response"""
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+
+
+def current_generation():
+    """Counter bumped by every invalidate() call"""
+    return _generation
+
+
+def _store(key, expires_at, result):
+    """Add an entry, dropping expired ones and then the least recently used"""
+    now = time.monotonic()
+    for stale in [k for k, (expiry, _) in _entries.items() if expiry <= now]:
+        del _entries[stale]
+
+    _entries[key] = (expires_at, result)
+    _entries.move_to_end(key)
+    while len(_entries) > MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+def cache_config(ttl_seconds: int = 300):
+    """
+    Cache an async endpoint's result keyed on its query parameters
+
+    Dependencies such as the database connection are left out of the key.
+    Entries expire after ttl_seconds or on the next invalidate() call, and
+    the least recently used ones are evicted beyond MAX_ENTRIES.
+    """
+    def decorator(func):
+        dependencies = {
+            name for name, param in inspect.signature(func).parameters.items()
+            if isinstance(param.default, params.Depends)
+        }
+
+        @wraps(func)
+        async def wrapper(**kwargs):
+            key = (func.__name__,) + tuple(
+                (name, value) for name, value in sorted(kwargs.items())
+                if name not in dependencies
+            )
+
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    _entries.move_to_end(key)
+                    return entry[1]
+
+            generation = _generation
+            result = await func(**kwargs)
+
+            # Streamed bodies can only be sent once, so never store them
+            if isinstance(result, Response):
+                return result
+
+            # Skip storing if an expense was written while we were querying
+            with _lock:
+                if generation == _generation:
+                    _store(key, time.monotonic() + ttl_seconds, result)
+
+            return result
+
+        return wrapper
+
+    return decorator
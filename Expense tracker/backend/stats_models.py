@@ -1,14 +1,18 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from typing import List, Optional
 
-class CategoryStats(BaseModel):
+class StatsModel(BaseModel):
+    """Base for the stats responses, readable from rows or attributes"""
+    model_config = ConfigDict(from_attributes=True, validate_assignment=False)
+
+class CategoryStats(StatsModel):
     """Statistics for a single category"""
     category: str
     total: float
     count: int
     average: float
 
-class OverallStats(BaseModel):
+class OverallStats(StatsModel):
     """Overall spending statistics"""
     total: float
     count: int
@@ -16,13 +20,13 @@ class OverallStats(BaseModel):
     min: float
     max: float
 
-class DailyStats(BaseModel):
+class DailyStats(StatsModel):
     """Daily spending statistics"""
     date: str
     total: float
     count: int
 
-class WeeklyStats(BaseModel):
+class WeeklyStats(StatsModel):
     """Weekly spending statistics"""
     week: str
     start_date: str
@@ -30,9 +34,23 @@ class WeeklyStats(BaseModel):
     total: float
     count: int
 
-class MonthlyStats(BaseModel):
+class MonthlyStats(StatsModel):
     """Monthly spending statistics"""
     month: str
     total: float
     count: int
-    average: float
\ No newline at end of file
+    average: float
+
+class DashboardStats(StatsModel):
+    """All dashboard statistics in a single response"""
+    by_category: List[CategoryStats]
+    total: OverallStats
+    by_date: List[DailyStats]
+    by_month: List[MonthlyStats]
+
+# Adapters validate a whole result list in one pydantic-core call
+CATEGORY_ADAPTER = TypeAdapter(List[CategoryStats])
+OVERALL_ADAPTER = TypeAdapter(OverallStats)
+DAILY_ADAPTER = TypeAdapter(List[DailyStats])
+WEEKLY_ADAPTER = TypeAdapter(List[WeeklyStats])
+MONTHLY_ADAPTER = TypeAdapter(List[MonthlyStats])
\ No newline at end of file
@@ -1,36 +1,151 @@
-from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi import APIRouter, Query, Depends
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Literal
 from datetime import date
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy import select, func, bindparam
+import numpy as np
 
-from models import Expense
-from database import SessionLocal
+from models import DailyRollup
+from database import read_engine
+from stats_cache import cache_config
+from stats_snapshot import get_snapshot, SNAPSHOT_TTL_SECONDS
 from stats_models import (
     CategoryStats,
     OverallStats,
     DailyStats,
     WeeklyStats,
-    MonthlyStats
+    MonthlyStats,
+    DashboardStats,
+    CATEGORY_ADAPTER,
+    OVERALL_ADAPTER,
+    DAILY_ADAPTER,
+    WEEKLY_ADAPTER,
+    MONTHLY_ADAPTER
 )
 
 # Create router for stats endpoints
 router = APIRouter(prefix="/api/stats", tags=["Statistics"])
 
-# Dependency
-def get_db():
-    db = SessionLocal()
+# Dependency: the stats only read aggregates, so a plain Core
+# connection is enough and avoids setting up an ORM session
+async def get_conn():
+    async with read_engine.connect() as conn:
+        yield conn
+
+
+# Statements are built once at import, one variant per combination of
+# date filters, so each request picks a ready statement with exactly the
+# WHERE clauses it needs and reuses its compiled SQL. Amounts are in cents.
+def _date_variants(stmt):
+    """Map (has_start, has_end) to stmt filtered on the 'sd'/'ed' params"""
+    start = DailyRollup.date >= bindparam('sd')
+    end = DailyRollup.date <= bindparam('ed')
+    return {
+        (False, False): stmt,
+        (True, False): stmt.where(start),
+        (False, True): stmt.where(end),
+        (True, True): stmt.where(start, end)
+    }
+
+# Order by the selected totals through their label, not a second SUM()
+_category_total = func.sum(DailyRollup.total).label('total')
+STMT_BY_CATEGORY = _date_variants(select(
+    DailyRollup.category,
+    _category_total,
+    func.sum(DailyRollup.count).label('count')
+).group_by(DailyRollup.category).order_by(_category_total.desc()))
+
+# Daily totals are converted from cents here, once, for both the
+# dashboard rows and the streamed JSON
+_day_total = func.sum(DailyRollup.total) / 100.0
+_day_count = func.sum(DailyRollup.count)
+
+def _daily(*columns):
+    return _date_variants(
+        select(*columns).group_by(DailyRollup.date).order_by(DailyRollup.date.desc())
+    )
+
+STMT_BY_DAY = _daily(DailyRollup.date, _day_total.label('total'), _day_count.label('count'))
+
+# The same daily rows rendered to JSON objects by SQLite itself, so the
+# streamed response never builds per-row Python dicts or rounds floats
+STMT_BY_DAY_JSON = _daily(func.json_object(
+    'date', DailyRollup.date,
+    'total', _day_total,
+    'count', _day_count
+))
+
+_week_key = DailyRollup.week.label('week')
+STMT_BY_WEEK = _date_variants(select(
+    _week_key,
+    func.min(DailyRollup.date).label('start_date'),
+    func.max(DailyRollup.date).label('end_date'),
+    func.sum(DailyRollup.total).label('total'),
+    func.sum(DailyRollup.count).label('count')
+).group_by('week').order_by(_week_key.desc()))
+
+# Group on the integer month key once, via its label
+_month_key = DailyRollup.month.label('month')
+STMT_BY_MONTH = select(
+    _month_key,
+    func.sum(DailyRollup.total).label('total'),
+    func.sum(DailyRollup.count).label('count')
+).group_by('month').order_by(_month_key.desc())
+
+
+def _date_filter(start_date: Optional[date], end_date: Optional[date]):
+    """Variant key and bind values for an optional date range"""
+    return (start_date is not None, end_date is not None), {'sd': start_date, 'ed': end_date}
+
+
+def _average(total: int, count: int) -> float:
+    """Average in currency units from a cents total, rounded to the cent"""
+    # Cheaper than an extra AVG() aggregate since SUM and COUNT are selected
+    # anyway. Rounds halves away from zero in exact integer arithmetic, as
+    # SQLite's ROUND() did.
+    if not count:
+        return 0
+    cents = (abs(total) * 2 + count) // (count * 2)
+    return (cents if total >= 0 else -cents) / 100
+
+
+def _format_daily(rows):
+    return [
+        {'date': str(date_val), 'total': total, 'count': count}
+        for date_val, total, count in rows
+    ]
+
+
+async def _daily_stats(conn: AsyncConnection, variant, params):
+    rows = (await conn.execute(STMT_BY_DAY[variant], params)).all()
+    return DAILY_ADAPTER.validate_python(_format_daily(rows))
+
+
+async def _stream_daily(connection, result):
+    """Yield daily stats as a JSON array, one chunk per batch of rows"""
+    # The connection outlives the handler, so it is closed once the body
+    # has been sent
     try:
-        yield db
+        yield b'['
+        separator = b''
+        async for rows in result.partitions():
+            yield separator + ','.join(row[0] for row in rows).encode()
+            separator = b','
+        yield b']'
     finally:
-        db.close()
+        await connection.close()
 
 
+# Handlers return validated models and FastAPI serializes them straight
+# to JSON through their response_model
 @router.get("/by-category", response_model=List[CategoryStats])
-def get_stats_by_category(
+@cache_config(ttl_seconds=300)
+async def get_stats_by_category(
     start_date: Optional[date] = Query(None, description="Filter from date"),
     end_date: Optional[date] = Query(None, description="Filter to date"),
-    db: Session = Depends(get_db)
+    conn: AsyncConnection = Depends(get_conn)
 ):
     """
     Get total spending by category
@@ -40,44 +155,25 @@ def get_stats_by_category(
     - Number of expenses
     - Average expense amount
     """
-    try:
-        # Build query
-        query = db.query(
-            Expense.category,
-            func.sum(Expense.amount).label('total'),
-            func.count(Expense.id).label('count'),
-            func.avg(Expense.amount).label('average')
-        )
-        
-        if start_date:
-            query = query.filter(Expense.date >= start_date)
-        
-        if end_date:
-            query = query.filter(Expense.date <= end_date)
-        
-        results = query.group_by(Expense.category).order_by(func.sum(Expense.amount).desc()).all()
-        
-        # Format response
-        stats = []
-        for category, total, count, average in results:
-            stats.append({
-                'category': category,
-                'total': round(total, 2),
-                'count': count,
-                'average': round(average, 2)
-            })
-        
-        return stats
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    variant, params = _date_filter(start_date, end_date)
+    results = (await conn.execute(STMT_BY_CATEGORY[variant], params)).all()
+    
+    # Format response, converting cents back to currency units
+    raw = [
+        {'category': category, 'total': total / 100, 'count': count, 'average': _average(total, count)}
+        for category, total, count in results
+    ]
+    return CATEGORY_ADAPTER.validate_python(raw)
 
 
+# Cached no longer than the snapshot, so writes from other processes
+# show up within SNAPSHOT_TTL_SECONDS here too
 @router.get("/total", response_model=OverallStats)
-def get_stats_total(
+@cache_config(ttl_seconds=SNAPSHOT_TTL_SECONDS)
+async def get_stats_total(
     start_date: Optional[date] = Query(None, description="Filter from date"),
     end_date: Optional[date] = Query(None, description="Filter to date"),
-    db: Session = Depends(get_db)
+    conn: AsyncConnection = Depends(get_conn)
 ):
     """
     Get overall spending statistics
@@ -87,142 +183,117 @@ def get_stats_total(
     - Number of expenses
     - Average, minimum, and maximum expense amounts
     """
-    try:
-        # Build query
-        query = db.query(
-            func.sum(Expense.amount).label('total'),
-            func.count(Expense.id).label('count'),
-            func.avg(Expense.amount).label('average'),
-            func.min(Expense.amount).label('min'),
-            func.max(Expense.amount).label('max')
-        )
-        
-        if start_date:
-            query = query.filter(Expense.date >= start_date)
-        
-        if end_date:
-            query = query.filter(Expense.date <= end_date)
-        
-        result = query.first()
-        
-        # Handle case when no expenses exist
-        if result[0] is None:
-            return {
-                'total': 0,
-                'count': 0,
-                'average': 0,
-                'min': 0,
-                'max': 0
-            }
-        
-        return {
-            'total': round(result[0], 2),
-            'count': result[1],
-            'average': round(result[2], 2),
-            'min': round(result[3], 2),
-            'max': round(result[4], 2)
+    # Slice the date range out of the sorted snapshot and aggregate it
+    dates, amounts = await get_snapshot(conn)
+    lo = np.searchsorted(dates, start_date.toordinal(), 'left') if start_date else 0
+    hi = np.searchsorted(dates, end_date.toordinal(), 'right') if end_date else len(dates)
+    selected = amounts[lo:hi]
+    
+    # Handle case when no expenses exist
+    if selected.size == 0:
+        raw = {
+            'total': 0,
+            'count': 0,
+            'average': 0,
+            'min': 0,
+            'max': 0
         }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    else:
+        total = int(selected.sum())
+        raw = {
+            'total': total / 100,
+            'count': int(selected.size),
+            'average': _average(total, int(selected.size)),
+            'min': int(selected.min()) / 100,
+            'max': int(selected.max()) / 100
+        }
+    
+    return OVERALL_ADAPTER.validate_python(raw)
 
 
 @router.get("/by-date")
-def get_stats_by_date(
+@cache_config(ttl_seconds=300)
+async def get_stats_by_date(
     start_date: Optional[date] = Query(None, description="Filter from date"),
     end_date: Optional[date] = Query(None, description="Filter to date"),
-    grouping: Literal["daily", "weekly"] = Query("daily", description="Grouping type"),
-    db: Session = Depends(get_db)
+    grouping: Literal["daily", "weekly"] = Query("daily", description="Grouping type")
 ):
     """
     Get spending by date (daily or weekly breakdown)
     
     - **grouping**: Choose 'daily' for day-by-day or 'weekly' for week-by-week
     """
-    try:
-        # Build query based on grouping
-        if grouping == 'daily':
-            query = db.query(
-                Expense.date,
-                func.sum(Expense.amount).label('total'),
-                func.count(Expense.id).label('count')
-            )
-            
-            if start_date:
-                query = query.filter(Expense.date >= start_date)
-            
-            if end_date:
-                query = query.filter(Expense.date <= end_date)
-            
-            results = query.group_by(Expense.date).order_by(Expense.date.desc()).all()
-            
-            # Format response
-            stats = []
-            for date_val, total, count in results:
-                stats.append({
-                    'date': str(date_val),
-                    'total': round(total, 2),
-                    'count': count
-                })
-        else:  # weekly
-            query = db.query(
-                func.strftime('%Y-W%W', Expense.date).label('week'),
-                func.min(Expense.date).label('start_date'),
-                func.max(Expense.date).label('end_date'),
-                func.sum(Expense.amount).label('total'),
-                func.count(Expense.id).label('count')
-            )
-            
-            if start_date:
-                query = query.filter(Expense.date >= start_date)
-            
-            if end_date:
-                query = query.filter(Expense.date <= end_date)
-            
-            results = query.group_by(func.strftime('%Y-W%W', Expense.date)).order_by(func.strftime('%Y-W%W', Expense.date).desc()).all()
-            
-            # Format response
-            stats = []
-            for week, start, end, total, count in results:
-                stats.append({
-                    'week': week,
-                    'start_date': str(start),
-                    'end_date': str(end),
-                    'total': round(total, 2),
-                    'count': count
-                })
-        
-        return stats
+    variant, params = _date_filter(start_date, end_date)
+    
+    if grouping == 'daily':
+        # Stream the rows, there can be one per day for years. The query is
+        # started before the response, so SQL errors still give a 500.
+        connection = await read_engine.connect()
+        try:
+            stmt = STMT_BY_DAY_JSON[variant].execution_options(yield_per=1000)
+            result = await connection.stream(stmt, params)
+        except Exception:
+            await connection.close()
+            raise
+        return StreamingResponse(_stream_daily(connection, result), media_type='application/json')
+    else:  # weekly
+        # Checked out here rather than as a dependency, since the daily
+        # stream keeps its connection open past the handler
+        async with read_engine.connect() as conn:
+            results = (await conn.execute(STMT_BY_WEEK[variant], params)).all()
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        # Format response
+        raw = [
+            {'week': week, 'start_date': str(start), 'end_date': str(end), 'total': total / 100, 'count': count}
+            for week, start, end, total, count in results
+        ]
+        return WEEKLY_ADAPTER.dump_python(WEEKLY_ADAPTER.validate_python(raw))
 
 
 @router.get("/by-month", response_model=List[MonthlyStats])
-def get_stats_by_month(db: Session = Depends(get_db)):
+@cache_config(ttl_seconds=300)
+async def get_stats_by_month(conn: AsyncConnection = Depends(get_conn)):
     """
     Get spending by month
     
     Returns monthly aggregated spending with totals, counts, and averages
     """
-    try:
-        results = db.query(
-            func.strftime('%Y-%m', Expense.date).label('month'),
-            func.sum(Expense.amount).label('total'),
-            func.count(Expense.id).label('count'),
-            func.avg(Expense.amount).label('average')
-        ).group_by(func.strftime('%Y-%m', Expense.date)).order_by(func.strftime('%Y-%m', Expense.date).desc()).all()
-        
-        stats = []
-        for month, total, count, average in results:
-            stats.append({
-                'month': month,
-                'total': round(total, 2),
-                'count': count,
-                'average': round(average, 2)
-            })
-        
-        return stats
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    results = (await conn.execute(STMT_BY_MONTH)).all()
+    
+    raw = [
+        {'month': f'{month // 100:04d}-{month % 100:02d}', 'total': total / 100, 'count': count, 'average': _average(total, count)}
+        for month, total, count in results
+    ]
+    return MONTHLY_ADAPTER.validate_python(raw)
+
+
+@router.get("/dashboard", response_model=DashboardStats)
+async def get_stats_dashboard(
+    start_date: Optional[date] = Query(None, description="Filter from date"),
+    end_date: Optional[date] = Query(None, description="Filter to date")
+):
+    """
+    Get every dashboard statistic in one request
+    
+    Runs the category, total, daily and monthly aggregations concurrently,
+    each on its own connection, so the dashboard needs a single round-trip
+    and waits only as long as the slowest aggregation.
+    """
+    variant, params = _date_filter(start_date, end_date)
+    
+    async def on_own_connection(stats, **kwargs):
+        async with read_engine.connect() as conn:
+            return await stats(conn=conn, **kwargs)
+    
+    by_category, total, by_date, by_month = await asyncio.gather(
+        on_own_connection(get_stats_by_category, start_date=start_date, end_date=end_date),
+        on_own_connection(get_stats_total, start_date=start_date, end_date=end_date),
+        on_own_connection(_daily_stats, variant=variant, params=params),
+        on_own_connection(get_stats_by_month)
+    )
+    return {
+        'by_category': by_category,
+        'total': total,
+        'by_date': by_date,
+        'by_month': by_month
+    }
\ No newline at end of file
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from models import Expense
+import stats_cache
+
+# All expense amounts (in cents) sorted by date, shared by the /total aggregations
+STMT_AMOUNTS = select(Expense.date, Expense.amount_cents).where(
+    Expense.date.is_not(None),
+    Expense.amount_cents.is_not(None)
+).order_by(Expense.date)
+
+# Reload at least this often, so writes made by other processes show up
+SNAPSHOT_TTL_SECONDS = 60
+
+_snapshot = None
+# Held while reloading, so concurrent requests wait for one reload
+_reload_lock = asyncio.Lock()
+
+
+def _current():
+    """The snapshot's (dates, amounts) if it is still valid, else None"""
+    snapshot = _snapshot
+    if (
+        snapshot is not None
+        and snapshot[0] == stats_cache.current_generation()
+        and time.monotonic() - snapshot[1] < SNAPSHOT_TTL_SECONDS
+    ):
+        return snapshot[2], snapshot[3]
+    return None
+
+
+async def get_snapshot(conn):
+    """
+    Return (dates, amounts) arrays for every expense, sorted by date
+
+    amounts are integer cents, so sums over them are exact.
+
+    dates holds date ordinals so a range can be sliced out with
+    np.searchsorted. The arrays are rebuilt on the first call after an
+    expense write in this process, using the same invalidation as the
+    stats cache, and otherwise once they are SNAPSHOT_TTL_SECONDS old.
+    """
+    global _snapshot
+
+    snapshot = _current()
+    if snapshot is not None:
+        return snapshot
+
+    async with _reload_lock:
+        # Another request may have reloaded while this one waited
+        snapshot = _current()
+        if snapshot is not None:
+            return snapshot
+
+        generation = stats_cache.current_generation()
+        loaded_at = time.monotonic()
+
+        rows = (await conn.execute(STMT_AMOUNTS)).all()
+        dates = np.fromiter((day.toordinal() for day, _ in rows), np.int32, len(rows))
+        amounts = np.fromiter((cents for _, cents in rows), np.int64, len(rows))
+
+        _snapshot = (generation, loaded_at, dates, amounts)
+        return dates, amounts
+
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import migrations
+from models import Expense
+
+# Values whose float representation sits just off a half cent
+AMOUNTS = [0, 1.005, 2.675, 0.125, 10.555, 99.995, 1000000.005, -1.005, -2.675, 0.001, 1e12]
+
+
+@pytest.fixture
+def legacy_engine():
+    """A database from before amounts were stored as cents"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE expenses (id INTEGER NOT NULL, title VARCHAR, amount FLOAT, "
+            "category VARCHAR, date DATE, PRIMARY KEY (id))"
+        ))
+    yield engine
+    engine.dispose()
+
+
+def insert_amounts(engine, amounts):
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO expenses (title, amount, category, date) VALUES ('t', :amount, 'food', '2026-01-05')"),
+            [{"amount": amount} for amount in amounts]
+        )
+
+
+def migrated_cents(engine):
+    with engine.begin() as connection:
+        migrations.migrate_amounts_to_cents(connection)
+        return connection.execute(text("SELECT amount, amount_cents FROM expenses ORDER BY id")).all()
+
+
+def test_backfill_matches_setter(legacy_engine):
+    generator = random.Random(0)
+    amounts = AMOUNTS + [round(generator.uniform(-10000, 10000), 3) for _ in range(2000)]
+    insert_amounts(legacy_engine, amounts)
+
+    for amount, cents in migrated_cents(legacy_engine):
+        assert cents == Expense(amount=amount).amount_cents, amount
+
+
+def test_backfill_resumes_and_skips_null_amounts(legacy_engine):
+    insert_amounts(legacy_engine, [1.5])
+    migrated_cents(legacy_engine)
+
+    # Rows written by an old process after the column was added
+    insert_amounts(legacy_engine, [2.675, None])
+    assert migrated_cents(legacy_engine) == [(1.5, 150), (2.675, 268), (None, None)]
@@ -0,0 +1,123 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+import rollup
+from database import Base
+from models import Expense, DailyRollup
+
+DAY = date(2026, 1, 5)
+OTHER_DAY = date(2026, 1, 6)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        yield session
+
+
+def add(db, amount, category="food", day=DAY):
+    expense = Expense(title="t", amount=amount, category=category, date=day)
+    db.add(expense)
+    db.commit()
+    return expense
+
+
+def buckets(db):
+    """The rollup as {(date, category): (total, count, min, max)}"""
+    rows = db.execute(select(
+        DailyRollup.date, DailyRollup.category,
+        DailyRollup.total, DailyRollup.count, DailyRollup.min, DailyRollup.max
+    )).all()
+    return {(day, category): tuple(values) for day, category, *values in rows}
+
+
+def rebuilt(db):
+    """The rollup as rebuild_rollup computes it from the expenses"""
+    rollup.rebuild_rollup(db.connection())
+    return buckets(db)
+
+
+def test_insert_adds_to_bucket(db):
+    add(db, 10.5)
+    add(db, 2.25)
+    add(db, 7, category="rent")
+
+    assert buckets(db) == {
+        (DAY, "food"): (1275, 2, 225, 1050),
+        (DAY, "rent"): (700, 1, 700, 700)
+    }
+    assert buckets(db) == rebuilt(db)
+
+
+def test_delete_refreshes_bucket(db):
+    smallest = add(db, 1)
+    add(db, 5)
+    last = add(db, 3, category="rent")
+
+    db.delete(smallest)
+    db.commit()
+    assert buckets(db) == {
+        (DAY, "food"): (500, 1, 500, 500),
+        (DAY, "rent"): (300, 1, 300, 300)
+    }
+
+    db.delete(last)
+    db.commit()
+    assert buckets(db) == {(DAY, "food"): (500, 1, 500, 500)}
+
+
+def test_update_moves_expense_between_buckets(db):
+    add(db, 4)
+    moved = add(db, 6)
+
+    moved.date = OTHER_DAY
+    moved.category = "rent"
+    db.commit()
+    assert buckets(db) == {
+        (DAY, "food"): (400, 1, 400, 400),
+        (OTHER_DAY, "rent"): (600, 1, 600, 600)
+    }
+
+    moved.amount = 8.5
+    db.commit()
+    assert buckets(db) == {
+        (DAY, "food"): (400, 1, 400, 400),
+        (OTHER_DAY, "rent"): (850, 1, 850, 850)
+    }
+    assert buckets(db) == rebuilt(db)
+
+
+@pytest.mark.parametrize("missing", ["date", "category", "amount"])
+def test_rows_with_missing_values_are_skipped(db, missing):
+    add(db, 3)
+    values = {"amount": 5, "category": "food", "day": DAY}
+    values["day" if missing == "date" else missing] = None
+    incomplete = add(db, **values)
+
+    assert buckets(db) == {(DAY, "food"): (300, 1, 300, 300)}
+    assert rebuilt(db) == {(DAY, "food"): (300, 1, 300, 300)}
+
+    db.delete(incomplete)
+    db.commit()
+    assert buckets(db) == {(DAY, "food"): (300, 1, 300, 300)}
+
+
+def test_rebuild_skips_null_rows_written_outside_the_app(db):
+    db.execute(text(
+        "INSERT INTO expenses (title, amount_cents, category, date) VALUES "
+        "('a', 100, 'food', '2026-01-05'), ('b', NULL, 'food', '2026-01-05'), "
+        "('c', 200, NULL, '2026-01-05'), ('d', 300, 'food', NULL)"
+    ))
+
+    assert rebuilt(db) == {(DAY, "food"): (100, 1, 100, 100)}